@@ -1,8 +1,11 @@
-from fastapi import APIRouter
+import orjson
+from fastapi import APIRouter, Response
 
 router = APIRouter()
 
+ADMIN_BODY = orjson.dumps({"message": "Admin getting schwifty"})
+
 
 @router.post("/")
 async def update_admin():
-    return {"message": "Admin getting schwifty"}
\ No newline at end of file
+    return Response(ADMIN_BODY, media_type="application/json")
\ No newline at end of file
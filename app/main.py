@@ -1,11 +1,16 @@
-from fastapi import Depends, FastAPI
+import orjson
+from fastapi import Depends, FastAPI, Response
+from fastapi.responses import ORJSONResponse
 
 from .dependencies import get_query_token, get_token_header
 from .internal import admin
 from .routers import items, users
 
-app = FastAPI(dependencies=[Depends(get_query_token)])
+app = FastAPI(
+    dependencies=[Depends(get_query_token)], default_response_class=ORJSONResponse
+)
 
+ROOT_BODY = orjson.dumps({"message": "Hello Bigger Applications!"})
 
 app.include_router(users.router)
 app.include_router(items.router)
@@ -20,4 +25,4 @@ app.include_router(
 
 @app.get("/")
 async def root():
-    return {"message": "Hello Bigger Applications!"}
\ No newline at end of file
+    return Response(ROOT_BODY, media_type="application/json")
\ No newline at end of file
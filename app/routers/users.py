@@ -1,18 +1,29 @@
-from fastapi import APIRouter
+from functools import lru_cache
+
+import orjson
+from fastapi import APIRouter, Response
 
 router = APIRouter()
 
+USERS_BODY = orjson.dumps([{"username": "Rick"}, {"username": "Morty"}])
+ME_BODY = orjson.dumps({"username": "fakecurrentuser"})
+
+
+@lru_cache(maxsize=4096)
+def user_body(username: str) -> bytes:
+    return orjson.dumps({"username": username})
+
 
 @router.get("/users/", tags=["users"])
 async def read_users():
-    return [{"username": "Rick"}, {"username": "Morty"}]
+    return Response(USERS_BODY, media_type="application/json")
 
 
 @router.get("/users/me", tags=["users"])
 async def read_user_me():
-    return {"username": "fakecurrentuser"}
+    return Response(ME_BODY, media_type="application/json")
 
 
 @router.get("/users/{username}", tags=["users"])
 async def read_user(username: str):
-    return {"username": username}
\ No newline at end of file
+    return Response(user_body(username), media_type="application/json")
\ No newline at end of file
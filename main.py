@@ -3,13 +3,21 @@ from uuid import UUID
 from typing import List, Set, Optional
 from enum import Enum
 from fastapi import FastAPI, Query, Path, Body, Cookie, Header, Form, File, UploadFile, \
-    HTTPException, Request, status, Depends
+    HTTPException, Request, Response, status, Depends
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, ORJSONResponse
 from fastapi.encoders import jsonable_encoder
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.datastructures import Headers, MutableHeaders
 from pydantic import BaseModel, Field, HttpUrl, EmailStr
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+import jwt
+from jwt.exceptions import InvalidTokenError
+import bcrypt
+import msgpack
+import msgspec
+import orjson
+import hashlib
+import os
 import time
 
 
@@ -32,6 +40,15 @@ class Image(BaseModel):
 
 
 class Item(BaseModel):
+    name: Optional[str] = None
+    description: Optional[str] = None
+    price: Optional[float] = None
+    tax: float = 10.5
+    tags: List[str] = Field(default_factory=list)
+
+
+class ItemStruct(msgspec.Struct):
+    """msgspec mirror of Item for serializing trusted stored items."""
     name: Optional[str] = None
     description: Optional[str] = None
     price: Optional[float] = None
@@ -39,6 +56,9 @@ class Item(BaseModel):
     tags: List[str] = []
 
 
+item_encoder = msgspec.json.Encoder()
+
+
 class Offer(BaseModel):
     name: str
     description: Optional[str] = None
@@ -75,6 +95,91 @@ class CommonQueryParams:
         self.limit = limit
 
 
+def accepts_msgpack(accept: str) -> bool:
+    qualities = {}
+    for media_range in accept.split(","):
+        media_type, *params = [part.strip() for part in media_range.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        media_type = media_type.lower()
+        qualities[media_type] = max(quality, qualities.get(media_type, 0.0))
+    msgpack_quality = qualities.get("application/x-msgpack", 0.0)
+    # The most specific range that matches JSON decides its quality
+    for media_type in ("application/json", "application/*", "*/*"):
+        if media_type in qualities:
+            json_quality = qualities[media_type]
+            break
+    else:
+        json_quality = 0.0
+    return msgpack_quality > json_quality
+
+
+class MsgPackMiddleware:
+    """Re-encode JSON responses as MessagePack for clients that accept it."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        if not accepts_msgpack(Headers(scope=scope).get("accept", "")):
+            await self.app(scope, receive, self.vary_on_accept(send))
+            return
+
+        send_with_vary = self.vary_on_accept(send)
+        start_message = None
+        body = []
+
+        async def send_msgpack(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if (
+                    headers.get("content-type") == "application/json"
+                    and message["status"] not in (204, 304)
+                ):
+                    start_message = message
+                    return
+                await send_with_vary(message)
+            elif start_message is None:
+                await send(message)
+            else:
+                body.append(message.get("body", b""))
+                if message.get("more_body", False):
+                    return
+                raw_body = b"".join(body)
+                if not raw_body:
+                    await send_with_vary(start_message)
+                    await send({"type": "http.response.body", "body": b""})
+                    return
+                content = msgpack.packb(orjson.loads(raw_body), use_bin_type=True)
+                headers = MutableHeaders(raw=start_message["headers"])
+                headers["content-type"] = "application/x-msgpack"
+                headers["content-length"] = str(len(content))
+                headers.add_vary_header("Accept")
+                await send(start_message)
+                await send({"type": "http.response.body", "body": content})
+
+        await self.app(scope, receive, send_msgpack)
+
+    @staticmethod
+    def vary_on_accept(send):
+        async def send_with_vary(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).add_vary_header("Accept")
+            await send(message)
+
+        return send_with_vary
+
+
 def query_extractor(q: Optional[str] = None):
     return q
 
@@ -98,30 +203,53 @@ async def verify_key(x_key: str = Header(...)):
     return x_key
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
+# GZip is added after MsgPackMiddleware so it compresses the re-encoded body
+app.add_middleware(MsgPackMiddleware)
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+BCRYPT_MAX_PASSWORD_BYTES = 72
+
+# Demo benchmarking only: remember bcrypt results for repeated logins.
+# Don't do this in production!
+DEV_MODE = os.environ.get("DEV_MODE") == "1"
+VERIFY_CACHE_SIZE = 1024
+VERIFY_CACHE_KEY = os.urandom(32)
+verified_passwords = {}
 
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    # bcrypt only uses the first 72 bytes; newer releases raise instead of truncating
+    password_bytes = plain_password.encode()[:BCRYPT_MAX_PASSWORD_BYTES]
+    if not DEV_MODE:
+        return bcrypt.checkpw(password_bytes, hashed_password.encode())
+    # Key on a MAC with a per-process secret, so cached entries hold neither the
+    # plaintext nor a fast unsalted hash that could be brute-forced offline
+    digest = hashlib.blake2b(password_bytes, key=VERIFY_CACHE_KEY, digest_size=16).digest()
+    key = (digest, hashed_password)
+    result = verified_passwords.get(key)
+    if result is None:
+        result = bcrypt.checkpw(password_bytes, hashed_password.encode())
+        if len(verified_passwords) >= VERIFY_CACHE_SIZE:
+            verified_passwords.clear()
+        verified_passwords[key] = result
+    return result
 
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    password_bytes = password.encode()[:BCRYPT_MAX_PASSWORD_BYTES]
+    return bcrypt.hashpw(password_bytes, bcrypt.gensalt()).decode()
 
 
 def get_user(db, username: str):
-    if username in db:
-        user_dict = db[username]
-        return UserInDB(**user_dict)
+    return db.get(username)
 
 
 def authenticate_user(fake_db, username: str, password: str):
     user = get_user(fake_db, username)
-    if not user:
+    if user is None:
         return False
     if not verify_password(password, user.hashed_password):
         return False
@@ -130,12 +258,12 @@ def authenticate_user(fake_db, username: str, password: str):
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
-    if expires_delta:
+    if expires_delta is not None:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    to_encode["exp"] = expire
+    encoded_jwt = jwt.encode(to_encode, SECRET_KEY_BYTES, algorithm=ALGORITHM)
     return encoded_jwt
 
 
@@ -146,14 +274,14 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, SECRET_KEY_BYTES, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
         token_data = TokenData(username=username)
-    except JWTError:
+    except InvalidTokenError:
         raise credentials_exception
-    user = get_user(fake_users_db, username=token_data.username)
+    user = get_user(fake_users, username=token_data.username)
     if user is None:
         raise credentials_exception
     return user
@@ -166,6 +294,7 @@ fake_db = {}
 # to get a string like this run:
 # openssl rand -hex 32
 SECRET_KEY = "09d25e094faa6ca2556c818166b7a9563b93f7099f6f0f4caa6cf63b88e8d3e7"
+SECRET_KEY_BYTES = SECRET_KEY.encode()
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
@@ -180,6 +309,12 @@ fake_users_db = {
     }
 }
 
+# Stored users were validated on the way in, so build the models once up front
+fake_users = {
+    username: UserInDB.model_construct(**user_dict)
+    for username, user_dict in fake_users_db.items()
+}
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -198,7 +333,7 @@ items = {
 def fake_decode_token(token):
     # This doesn't provide any security at all
     # Check the next version
-    user = get_user(fake_users_db, token)
+    user = get_user(fake_users, token)
     return user
 
 
@@ -213,8 +348,8 @@ async def get_current_active_user(current_user: User = Depends(get_current_user)
 
 
 @app.post("/token", response_model=Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
-    user = authenticate_user(fake_users_db, form_data.username, form_data.password)
+def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
+    user = authenticate_user(fake_users, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -230,10 +365,9 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
 
 @app.post("/token")
 async def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    user_dict = fake_users_db.get(form_data.username)
-    if not user_dict:
+    user = fake_users.get(form_data.username)
+    if user is None:
         raise HTTPException(status_code=400, detail="Incorrect username or password")
-    user = UserInDB(**user_dict)
     hashed_password = fake_hash_password(form_data.password)
     if not hashed_password == user.hashed_password:
         raise HTTPException(status_code=400, detail="Incorrect username or password")
@@ -405,15 +539,17 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
 
 @app.get("/items/{item_id}", response_model=Item)
 async def read_item(item_id: str):
-    return items[item_id]
+    item = msgspec.convert(items[item_id], ItemStruct)
+    return Response(item_encoder.encode(item), media_type="application/json")
 
 
 @app.patch("/items/{item_id}", response_model=Item)
 async def update_item(item_id: str, item: Item):
     stored_item_data = items[item_id]
-    stored_item_model = Item(**stored_item_data)
-    update_data = item.dict(exclude_unset=True)
-    updated_item = stored_item_model.copy(update=update_data)
+    # Stored items were validated on the way in, skip re-validation
+    stored_item_model = Item.model_construct(**stored_item_data)
+    update_data = item.model_dump(exclude_unset=True)
+    updated_item = stored_item_model.model_copy(update=update_data)
     items[item_id] = jsonable_encoder(updated_item)
     return updated_item
 
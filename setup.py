@@ -0,0 +1,22 @@
+from setuptools import setup
+from Cython.Build import cythonize
+
+# Build in place with: python setup.py build_ext --inplace
+# FastAPI parameters are declared as e.g. `q: str = Depends(...)`, so Cython
+# must not turn annotations into C type checks.
+setup(
+    ext_modules=cythonize(
+        [
+            "main.py",
+            "app/main.py",
+            "app/dependencies.py",
+            "app/internal/admin.py",
+            "app/routers/items.py",
+            "app/routers/users.py",
+            "sql_app/main.py",
+            "sql_app/crud.py",
+        ],
+        language_level=3,
+        compiler_directives={"annotation_typing": False},
+    ),
+)
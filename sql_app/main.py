@@ -1,6 +1,8 @@
 from typing import List
 
 from fastapi import Depends, FastAPI, HTTPException, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 
 from . import crud, models, schemas
@@ -8,7 +10,8 @@ from .database import SessionLocal, engine
 
 models.Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
 
 
 @app.middleware("http")
@@ -30,9 +33,18 @@ def get_db(request: Request):
 @app.post("/users/", response_model=schemas.User)
 def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
     db_user = crud.get_user_by_email(db, email=user.email)
-    if db_user:
+    if db_user is not None:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.create_user(db=db, user=user)
+    db_user = crud.create_user(db=db, user=user)
+    # A freshly created user has no items yet, so skip the ORM -> schema pass
+    return ORJSONResponse(
+        {
+            "email": db_user.email,
+            "id": db_user.id,
+            "is_active": db_user.is_active,
+            "items": [],
+        }
+    )
 
 
 @app.get("/users/", response_model=List[schemas.User])